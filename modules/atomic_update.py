@@ -1,5 +1,8 @@
 import orjson
+import os
+import tempfile
 from atomicwrites import atomic_write
+from concurrent.futures import ThreadPoolExecutor
 from logging_config import get_logger
 from json import JSONDecodeError
 
@@ -14,14 +17,60 @@ def atomic_write_json(data, file_path, temp_dir='tmp/'):
     except Exception as e:
         logger.exception(f"Error writing JSON data to file {file_path}: {e}")
 
-def atomic_write_text(data, file_path, temp_dir='tmp/'):
+def _write_synced_temp_json(data, file_path):
+    """Write JSON data to a synced temporary file next to file_path and return its path."""
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(file_path) or '.', prefix='.', suffix='.tmp')
     try:
-        logger.info(f"Attempting to write text data to file: {file_path}")
-        with atomic_write(file_path, overwrite=True, mode='w', encoding='utf-8', dir=temp_dir) as f:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(orjson.dumps(data))
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return temp_path
+
+def atomic_write_json_many(entries, max_workers=8):
+    """
+    Atomically write several JSON files, given as a {file_path: data} mapping.
+    The temporary files are written and synced concurrently, then renamed into
+    place; each containing directory is synced once rather than once per file.
+    """
+    if not entries:
+        return
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(entries))) as executor:
+        temp_files = {file_path: executor.submit(_write_synced_temp_json, data, file_path)
+                      for file_path, data in entries.items()}
+
+    directories = set()
+    for file_path, temp_file in temp_files.items():
+        try:
+            os.replace(temp_file.result(), file_path)
+            directories.add(os.path.dirname(file_path) or '.')
+            logger.info(f"Successfully wrote JSON data to file: {file_path}")
+        except Exception as e:
+            logger.exception(f"Error writing JSON data to file {file_path}: {e}")
+
+    if os.name != 'posix':
+        return
+    for directory in directories:
+        try:
+            dir_fd = os.open(directory, os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+        except OSError as e:
+            logger.exception(f"Error syncing directory {directory}: {e}")
+
+def atomic_write_bytes(data, file_path, temp_dir='tmp/'):
+    try:
+        logger.info(f"Attempting to write binary data to file: {file_path}")
+        with atomic_write(file_path, overwrite=True, mode='wb', dir=temp_dir) as f:
             f.write(data)
-        logger.info(f"Successfully wrote text data to file: {file_path}")
+        logger.info(f"Successfully wrote binary data to file: {file_path}")
     except Exception as e:
-        logger.exception(f"Error writing text data to file {file_path}: {e}")
+        logger.exception(f"Error writing binary data to file {file_path}: {e}")
 
 def atomic_append_json(new_data, file_path, temp_dir='tmp/'):
     try:
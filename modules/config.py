@@ -1,4 +1,5 @@
 import os
+from functools import lru_cache
 
 import toml
 from rich.console import Console
@@ -7,6 +8,16 @@ from toml.decoder import TomlDecodeError
 console = Console()
 
 
+def get_config(file_path="config.toml"):
+    """Return the shared Config for a configuration file, parsing it only once per process."""
+    return _load_config(file_path)
+
+
+@lru_cache(maxsize=None)
+def _load_config(file_path):
+    return Config(file_path)
+
+
 class PickleableTomlDecoder(toml.TomlDecoder):
     def get_empty_inline_table(self):
         return self.get_empty_table()
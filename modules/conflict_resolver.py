@@ -1,11 +1,10 @@
 import orjson
-from config import Config
 
 class ConflictResolver:
     def __init__(self, config):
         """Initialize the ConflictResolver with configuration."""
-        self.config = Config()  # Create a Config object
-        self.ambiguous_aws = self.config.get_ambiguous_aws()  # Load ambiguous AWs using Config class
+        self.config = config
+        self.ambiguous_aws = set(self.config.get_ambiguous_aws())  # Load ambiguous AWs using Config class, as a set for membership tests
         self.machine_solutions = {}
         self.user_solutions = {}
         self.load_machine_solutions()
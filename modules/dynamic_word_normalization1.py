@@ -1,24 +1,79 @@
 import os
-import json
 import re
+import signal
+import sys
 import orjson
 
+from dataclasses import dataclass
+from functools import lru_cache
+import nltk
 from nltk.stem import WordNetLemmatizer
 from nltk.corpus import wordnet
 from rich.progress import Progress
-from atomic_update import atomic_append_dict, atomic_write_json
+from atomic_update import atomic_append_dict
 from concurrent.futures import ProcessPoolExecutor
-from threading import Lock
+from file_utils import iter_text_files
+from threading import Lock, Thread
 from logging_config import get_logger
 
+# Punctuation stripped from unresolved abbreviated words before they are logged
+PUNCTUATION_PATTERN = re.compile(r"[,;:!?(){}]")
+
+
+
+@dataclass(slots=True)
+class UnresolvedAW:
+    """
+    An abbreviated word left unresolved, with its location and context.
+    Slotted, as a corpus yields one per occurrence; orjson writes it out as a plain object.
+    """
+    filename: str
+    line: int
+    column: int
+    unresolved_aw: str
+    context: str
+
+
 lemmatizer = None
 logger = get_logger(__name__)
+worker_args = None
+
+
+def ensure_wordnet():
+    """
+    Download the WordNet corpus only when it is not installed yet, instead of
+    contacting the NLTK server on every start.
+    """
+    for resource in ('corpora/wordnet.zip', 'corpora/wordnet'):
+        try:
+            nltk.data.find(resource)
+            return
+        except LookupError:
+            pass
+    logger.info("WordNet corpus not found, downloading it.")
+    nltk.download('wordnet', quiet=True)
+
+
+def load_wordnet():
+    """Make sure the WordNet corpus is installed and load it into memory."""
+    ensure_wordnet()
+    try:
+        wordnet.ensure_loaded()
+    except LookupError as e:
+        logger.error(f"Could not load WordNet: {e}")
 
 
-def initialize_process():
-    global lemmatizer, logger
+def initialize_process(machine_solutions, user_solutions, context_size, machine_solutions_path):
+    """
+    Set up a worker process once, so that the solution dictionaries are sent
+    to each worker a single time instead of being pickled with every file.
+    """
+    global lemmatizer, logger, worker_args
+    # Ctrl+C is handled by the main process alone, between stages; workers ignore it.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
     lemmatizer = WordNetLemmatizer()
     logger = get_logger(__name__)
+    worker_args = (machine_solutions, user_solutions, context_size, machine_solutions_path)
 
 
 def load_json(filepath):
@@ -26,38 +81,32 @@ def load_json(filepath):
         return orjson.loads(file.read())
 
 
-def save_json_data(pending_json_data):
-    """
-    Save pending json data to json disk.
-    """
-    for filename, data in pending_json_data.items():
-        correct_path = os.path.join('data/', filename)
-        atomic_write_json(data, correct_path)
-    logger.info("Saved pending json data to disk.")
-
-
 def save_json(file_path, data):
     atomic_append_dict(data, file_path)
 
 
+# Abbreviated words recur throughout a corpus, so each worker remembers WordNet's answers.
+@lru_cache(maxsize=200_000)
 def consult_wordnet(aw):
     """
-    Consults WordNet to find a solution for the abbreviated word
+    Consults WordNet to find a solution for the abbreviated word.
+    wordnet.morphy answers from the in-memory lemma index, whereas wordnet.synsets
+    would also read every matching synset from the data files.
     """
     word_n = aw.replace("$", "n")
-    if wordnet.synsets(word_n):
+    if wordnet.morphy(word_n.lower()) is not None:
         return word_n
     word_m = aw.replace("$", "m")
-    if wordnet.synsets(word_m):
+    if wordnet.morphy(word_m.lower()) is not None:
         return word_m
     return None
 
 
-def process_file_wrapper(args):
-    return process_file(*args)
+def process_file_wrapper(file_path):
+    return process_file(file_path, *worker_args)
 
 
-def process_aws(token, filename, token_idx, text, tokens, machine_solutions, user_solutions, machine_solutions_path, context_size):
+def process_aws(token, filename, token_idx, line_number, tokens, machine_solutions, user_solutions, machine_solutions_path, context_size):
     local_unresolved_aws = []
     if "$" not in token:
         return local_unresolved_aws
@@ -65,7 +114,6 @@ def process_aws(token, filename, token_idx, text, tokens, machine_solutions, use
     start_index = max(0, token_idx - context_size)
     end_index = min(len(tokens), token_idx + context_size + 1)
     context_tokens = tokens[start_index:end_index]
-    line_number = text.count('\n', 0, text.find(token)) + 1
 
     try:
         solution = machine_solutions.get(token)
@@ -97,16 +145,8 @@ def log_unresolved_aw(aw, filename, line_number, context_words, context_size, lo
     start_index = max(0, aw_index - context_size)
     end_index = min(len(context_words), aw_index + context_size + 1)
     context = " ".join(context_words[start_index:end_index])
-    sanitized_aw = re.sub(r"[,;:!?(){}]", "", aw)
-    local_unresolved_aws.append(
-        {
-            "filename": filename,
-            "line": line_number,
-            "column": aw_index,
-            "unresolved_aw": sanitized_aw,
-            "context": context,
-        }
-    )
+    sanitized_aw = PUNCTUATION_PATTERN.sub("", aw)
+    local_unresolved_aws.append(UnresolvedAW(filename, line_number, aw_index, sanitized_aw, context))
 
 
 def process_file(file_path, machine_solutions, user_solutions, context_size, machine_solutions_path):
@@ -116,10 +156,17 @@ def process_file(file_path, machine_solutions, user_solutions, context_size, mac
         with open(file_path, "r", encoding="utf-8") as file:
             text = file.read()
             tokens = text.split()
-            for token_idx, token in enumerate(tokens):
-                unresolved_for_token = process_aws(token, file_path, token_idx, text, tokens, machine_solutions,
-                                                   user_solutions, machine_solutions_path, context_size)
-                local_unresolved_aws.extend(unresolved_for_token)
+            # Single sweep over the lines: token indices and line numbers advance together,
+            # instead of searching the whole text again for every abbreviated word.
+            token_idx = 0
+            for line_number, line in enumerate(text.split("\n"), start=1):
+                for token in line.split():
+                    if "$" in token:
+                        unresolved_for_token = process_aws(token, file_path, token_idx, line_number, tokens,
+                                                           machine_solutions, user_solutions,
+                                                           machine_solutions_path, context_size)
+                        local_unresolved_aws.extend(unresolved_for_token)
+                    token_idx += 1
     except UnicodeDecodeError:
         logger.error(f"Error decoding file {file_path} as UTF-8.")
 
@@ -143,8 +190,6 @@ class DynamicWordNormalization1:
 
         self.load_machine_solutions()
         self.context_size = int(config.get("settings", "context_size"))
-        self.progress = Progress()
-        self.task_id = self.progress.add_task("[cyan]Processing...", total=100)
         self.compiled_pattern = re.compile(self.pattern)
         self.wordnet_lock = Lock()
 
@@ -160,9 +205,9 @@ class DynamicWordNormalization1:
 
     def load_machine_solutions(self):
         try:
-            with open(self.machine_solutions_path, "r", encoding="utf-8") as file:
+            with open(self.machine_solutions_path, "rb") as file:
                 contents = file.read().strip()
-                self.machine_solutions = json.loads(contents) if contents else {}
+                self.machine_solutions = orjson.loads(contents) if contents else {}
         except FileNotFoundError:
             logger.error("Machine solutions file not found.")
             self.machine_solutions = {}
@@ -170,13 +215,6 @@ class DynamicWordNormalization1:
     def extract_aws(self, text):
         self.compiled_pattern.findall(text)
 
-    @staticmethod
-    def total_files(directory_path):
-        count = 0
-        for root, _, files in os.walk(directory_path):
-            count += len(files)
-        return count
-
     def save_unresolved_aws(self):
         logger.info(f"Saving {len(self.unresolved_aws_log)} unresolved aws.")
         unresolved_aws_path = self.config.get("data", "unresolved_aws_path")
@@ -184,28 +222,38 @@ class DynamicWordNormalization1:
 
     def preprocess_directory(self, directory_path):
         logger.setLevel(50)
-        total_files = DynamicWordNormalization1.total_files(directory_path)
-
-        with ProcessPoolExecutor(initializer=initialize_process) as executor, Progress() as progress:
-            task = progress.add_task("[cyan]Analyzing files...", total=total_files)
-            file_args = []
-
-            for root, _, files in os.walk(directory_path):
-                for file_name in files:
-                    if not file_name.startswith('.') and file_name.endswith('.txt'):
-                        file_path = os.path.join(root, file_name)
-                        args = (file_path, self.machine_solutions, self.user_solutions, int(self.context_size),
-                                self.machine_solutions_path)
-                        assert len(args) == 5
-                        file_args.append(args)
-
+        # Loading WordNet takes a few seconds, so it happens in the background while the
+        # input directory is walked. It is only started here, as no other stage's pool may
+        # be forked while the thread runs, and joined before this stage's pool is created,
+        # so that its workers inherit WordNet already loaded.
+        wordnet_loader = Thread(target=load_wordnet, daemon=True)
+        wordnet_loader.start()
+        # A single scandir pass; the progress total is the length of the list it produces.
+        file_paths = list(iter_text_files(directory_path, include_hidden=False))
+        wordnet_loader.join()
+
+        initargs = (self.machine_solutions, self.user_solutions, int(self.context_size),
+                    self.machine_solutions_path)
+
+        with ProcessPoolExecutor(initializer=initialize_process, initargs=initargs) as executor, \
+                Progress() as progress:
+            task = progress.add_task("[cyan]Analyzing files...", total=len(file_paths))
             aggregated_unresolved_aws = []
 
-            results = executor.map(process_file_wrapper, file_args)
+            results = executor.map(process_file_wrapper, file_paths, chunksize=8)
 
-            for local_unresolved in results:
-                aggregated_unresolved_aws.extend(local_unresolved)
-                progress.update(task, advance=1)
+            try:
+                for local_unresolved in results:
+                    # The same abbreviations recur across the corpus; interning keeps a single
+                    # copy of each instead of one per occurrence unpickled from the workers.
+                    for entry in local_unresolved:
+                        entry.unresolved_aw = sys.intern(entry.unresolved_aw)
+                    aggregated_unresolved_aws.extend(local_unresolved)
+                    progress.update(task, advance=1)
+            except BaseException:
+                # On shutdown, drop the queued files instead of waiting for all of them to run.
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
 
             self.unresolved_aws_log = aggregated_unresolved_aws
             self.save_unresolved_aws()
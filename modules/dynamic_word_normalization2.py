@@ -23,7 +23,9 @@ import orjson
 import Levenshtein
 import ijson
 
-from Levenshtein import distance as lev_distance
+from functools import lru_cache
+from rapidfuzz import process
+from rapidfuzz.distance.Levenshtein import distance as lev_distance
 from colorama import Fore
 from prompt_toolkit import prompt
 from rich.console import Console
@@ -35,6 +37,10 @@ from logging_config import get_logger
 from atomic_update import atomic_append_json
 
 
+# Punctuation attached to the start or end of a word
+EDGE_PUNCTUATION_PATTERN = re.compile(r"^[,;:!?(){}.]|[,;:!?(){}.]$")
+
+
 class UserQuitException(Exception):
     pass
 
@@ -59,12 +65,12 @@ class DynamicWordNormalization2:
         self.batch_size = config.get("settings", "batch_size", 1000)
         self.unresolved_aws_path = unresolved_aws_path
         self.unresolved_aws = self.load_unresolved_aws(unresolved_aws_path)
-        self.ambiguous_aws = ambiguous_aws
+        self.ambiguous_aws = set(ambiguous_aws)
         self.solved_aws_count = 0
         self.processed_files_count = 0
         self.remaining_aws_count = len(self.unresolved_aws)
         self.remaining_files_count = len(
-            set([aw["filename"] for aw in self.unresolved_aws])
+            {aw["filename"] for aw in self.unresolved_aws}
         )
 
         custom_theme = Theme(
@@ -88,6 +94,9 @@ class DynamicWordNormalization2:
         except FileNotFoundError:
             self.existing_machine_solutions = {}
 
+        # Closest known words already looked up, cleared whenever a solution is added
+        self.suggestion_cache = {}
+
     def validate_config(self, config):
         """ Validate the configuration parameters.
         Raises a ValueError if a required configuration is missing or invalid."""
@@ -159,6 +168,7 @@ class DynamicWordNormalization2:
 
         self.existing_user_solutions = self.load_existing_solutions(user_solution_path)
         self.existing_user_solutions[unresolved_aw] = correct_word
+        self.suggestion_cache.clear()
 
         # Write the updated user solutions back to the file
         atomic_append_json(self.existing_user_solutions, user_solution_path)
@@ -227,12 +237,14 @@ class DynamicWordNormalization2:
             self.print_status()
 
     @staticmethod
+    @lru_cache(maxsize=4096)
     def remove_trailing_punctuation(word):
-        return re.sub(r"^[,;:!?(){}.]|[,;:!?(){}.]$", "", word)
+        return EDGE_PUNCTUATION_PATTERN.sub("", word)
 
     def generate_suggestions(self, unresolved_aw, threshold=3):
-        best_suggestion = None
-        min_distance = float("inf")
+        key = (unresolved_aw, threshold)
+        if key in self.suggestion_cache:
+            return self.suggestion_cache[key]
 
         # Combine user and machine solutions for comprehensive search
         all_solutions = {
@@ -240,13 +252,11 @@ class DynamicWordNormalization2:
             **self.existing_machine_solutions,
         }
 
-        for existing_aw, solution in all_solutions.items():
-            curr_distance = lev_distance(unresolved_aw, existing_aw)
-
-            if curr_distance < min_distance and curr_distance <= threshold:
-                min_distance = curr_distance
-                best_suggestion = solution
-
+        # The closest known word within the threshold, found in a single native
+        # scan; ties go to the first word, as before.
+        match = process.extractOne(unresolved_aw, all_solutions.keys(), scorer=lev_distance, score_cutoff=threshold)
+        best_suggestion = None if match is None else all_solutions[match[0]]
+        self.suggestion_cache[key] = best_suggestion
         return best_suggestion
 
     def log_difficult_passage(self, file_name, line_number, column, context, abbreviated_word):
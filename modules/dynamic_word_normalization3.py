@@ -27,30 +27,27 @@ import math
 import logging
 
 from collections import Counter
-from config import Config
-from dynamic_word_normalization2 import DynamicWordNormalization2
-from gpt_suggestions import GPTSuggestions
+from concurrent.futures import ThreadPoolExecutor
+from dynamic_word_normalization2 import DynamicWordNormalization2, UserQuitException
 from json import JSONDecodeError
 from logging_config import get_logger
 from atomic_update import atomic_append_json
 from rich.console import Console
 from rich.panel import Panel
-from Levenshtein import distance as lev_distance
 from colorama import Fore
 
 
-class UserQuitException(Exception):
-    pass
-
 class DynamicWordNormalization3:
     def __init__(self, config, difficult_passages_file='data/difficult_passages.json', user_solution_file='data/user_solution.json'):
         self.logger = get_logger(__name__)
         logging_level = getattr(logging, config.debug_level, logging.WARNING)
         self.logger.setLevel(logging_level)
         self.console = Console()
-        self.config = Config()
+        self.config = config
         use_gpt = self.config.get_openai_integration('gpt_suggestions')
         if use_gpt:
+            # Imported only when suggestions are enabled, as it loads the openai client library.
+            from gpt_suggestions import GPTSuggestions
             self.gpt4 = GPTSuggestions(config)
         else:
             self.gpt4 = None
@@ -148,7 +145,8 @@ class DynamicWordNormalization3:
                 self.logger.info(f"File: {file}, Total Words: {total_words}, Difficulties Count: {difficulties_count}, Log Ratio: {sqrt_ratio:.4f}")
 
         self.logger.info("Ratios calculated. Sorting ratios for presentation.")
-        sorted_ratios = {k: v for k, v in sorted(ratios_per_file.items(), key=lambda item: item[1], reverse=True)}
+        sorted_ratios = {file: ratios_per_file[file]
+                         for file in sorted(ratios_per_file, key=ratios_per_file.__getitem__, reverse=True)}
 
         self.print_ascii_bar_chart(sorted_ratios, "Files by Ratio of Difficult Passages to Total Words:")
         self.logger.info("Difficult passages ratios sorted and presented.")
@@ -175,26 +173,6 @@ class DynamicWordNormalization3:
 
 
 
-    def get_gpt_suggestion_for_passage(self, passage):
-        context = passage['context']  # Adjust this based on how your context is structured
-        suggestion = self.gpt4.get_and_print_suggestion(context)
-        return suggestion
-
-
-    def generate_suggestions(self, unresolved_aw, threshold=3):
-        best_suggestion = None
-        min_distance = float("inf")
-
-        all_solutions = {**self.existing_user_solutions, **self.existing_machine_solutions}
-        for existing_aw, solution in all_solutions.items():
-            curr_distance = lev_distance(unresolved_aw, existing_aw)
-            if curr_distance < min_distance and curr_distance <= threshold:
-                min_distance = curr_distance
-                best_suggestion = solution
-
-        return best_suggestion
-
-
     def print_ascii_bar_chart(self, data, title, scale_factor=1000):
         if not data:
             self.logger.warning("No enough data available for bar chart.")
@@ -225,7 +203,27 @@ class DynamicWordNormalization3:
         self.logger.info(f"Fixing file: {file_path}")
         passages_to_fix = [p for p in self.difficult_passages if p['file_name'] == file_path]
 
-        for passage in passages_to_fix:
+        # Request the LLM suggestions in the background, in display order, so that the first
+        # passage only waits for its own answer while the following ones load.
+        executor = None
+        if self.gpt4 and passages_to_fix:
+            executor = ThreadPoolExecutor(max_workers=self.gpt4.params.concurrency)
+            items = [(p['abbreviated_word'], p['context']) for p in passages_to_fix]
+            suggestion_futures = self.gpt4.submit_suggestions(executor, items)
+        else:
+            suggestion_futures = [None] * len(passages_to_fix)
+
+        try:
+            self._review_passages(file_path, passages_to_fix, suggestion_futures)
+        finally:
+            if executor is not None:
+                # Requests for passages the user never reached are dropped.
+                executor.shutdown(wait=False, cancel_futures=True)
+
+        self.logger.info(f"File {file_path} has been processed.")
+
+    def _review_passages(self, file_path, passages_to_fix, suggestion_futures):
+        for passage, suggestion_future in zip(passages_to_fix, suggestion_futures):
             word = passage['abbreviated_word']
             context = passage['context']
             line_number = passage['line_number']
@@ -237,9 +235,8 @@ class DynamicWordNormalization3:
             self.console.print(panel)
 
             # Fetch GPT-4 suggestion
-            if self.gpt4:
-                gpt_suggestion = self.gpt4.get_suggestion(word, context)
-                self.console.print(f"[bold]LLM suggestion:[/bold] {gpt_suggestion}", style="bold blue")
+            if suggestion_future is not None:
+                self.console.print(f"[bold]LLM suggestion:[/bold] {suggestion_future.result()}", style="bold blue")
             else:
                 self.console.print("[bold]LLM suggestion:[/bold] Not available", style="bold blue")
 
@@ -259,9 +256,6 @@ class DynamicWordNormalization3:
                 raise UserQuitException()
 
 
-        self.logger.info(f"File {file_path} has been processed.")
-
-
     def handle_word_with_user_input(self, word, context, file_name, line_number, column):
         # Call the handle_user_input method of DynamicWordNormalization2
         correct_word = self.dwn2.handle_user_input(word, context, file_name, line_number, column)
@@ -285,10 +279,3 @@ class DynamicWordNormalization3:
             self.logger.info(f"Successfully updated user solution for '{word}'")
         except Exception as e:
             self.logger.error(f"Error updating user solution for '{word}': {e}")
-
-    def get_gpt4_suggestions(self, passage):
-        if self.gpt4:
-            suggestions = self.gpt4.get_suggestions(passage)
-            return suggestions
-        else:
-            return None
@@ -1,15 +1,32 @@
+import hashlib
+import multiprocessing
 import orjson
 import os
-from multiprocessing import Pool
+import pickle
+import signal
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
-from atomic_update import atomic_write_text
-from config import Config
+from atomic_update import atomic_write_bytes
+from config import get_config
 from logging import getLogger
-from ahocorasick import Automaton
+from ahocorasick import Automaton, load as load_automaton
 
 # Global variable for the FileProcessor instance
 file_processor_instance = None
 
+# Directory holding the pickled automaton, keyed by a hash of the solutions
+AUTOMATON_CACHE_DIR = 'tmp/'
+AUTOMATON_CACHE_PREFIX = 'solutions.ac.'
+
+# Part of the cache key; bump it whenever the payload stored in the automaton changes
+AUTOMATON_FORMAT_VERSION = 1
+
+# Upper bound on the number of files handed to a worker in a single task
+FILE_BATCH_SIZE = 64
+
+# Below this many files, threads are used instead of worker processes
+THREADED_FILE_LIMIT = 200
+
 
 def load_solutions(file_path: str) -> dict:
     """Load solutions from a JSON file."""
@@ -26,9 +43,40 @@ def process_files_in_parallel(file_list: list, num_workers: int):
     if not file_processor_instance:
         file_processor_instance = FileProcessor()
 
-    # Utilize multiprocessing for parallel processing
-    with Pool(num_workers) as p:
-        p.map(process_file_wrapper, file_list)
+    # A pool is not worth its start-up cost for a couple of files.
+    if num_workers == 1 or len(file_list) <= 2:
+        for file_path in file_list:
+            file_processor_instance.process_file(file_path)
+        return
+
+    # With fork, workers inherit the instance (and its automaton) from this process;
+    # otherwise the initializer builds it once per worker rather than once per task.
+    start_method = "fork" if "fork" in multiprocessing.get_all_start_methods() else None
+    context = multiprocessing.get_context(start_method)
+    initargs = (
+        file_processor_instance.config.file_path,
+        file_processor_instance.user_solution_file,
+        file_processor_instance.machine_solution_file,
+    )
+    # Tasks only carry file paths; several are sent per round trip to the worker.
+    chunksize = max(1, min(FILE_BATCH_SIZE, len(file_list) // (num_workers * 4)))
+    with ProcessPoolExecutor(max_workers=num_workers, mp_context=context,
+                             initializer=_init_worker, initargs=initargs) as executor:
+        try:
+            for _ in executor.map(process_file_wrapper, file_list, chunksize=chunksize):
+                pass
+        except BaseException:
+            # Don't run the remaining files when the run is being shut down.
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+
+def _init_worker(config_file, user_solution_file, machine_solution_file):
+    global file_processor_instance
+    # Leave Ctrl+C to the main process, which stops between stages.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if file_processor_instance is None:
+        file_processor_instance = FileProcessor(config_file, user_solution_file, machine_solution_file)
 
 
 # Wrapper function for parallel processing with an explicit initialization
@@ -42,94 +90,133 @@ def process_file_wrapper(file_path):
 class FileProcessor:
     def __init__(self, config_file='config.toml', user_solution_file='user_solution.json', machine_solution_file='machine_solution.json'):
         self.logger = getLogger(__name__)
-        self.config = Config(config_file)
+        self.config = get_config(config_file)
         self.output_path = self.config.get("paths", "output_path")
         self.user_solution_file = user_solution_file
         self.machine_solution_file = machine_solution_file
         self.user_solutions = load_solutions(file_path=self.user_solution_file)
         self.machine_solutions = load_solutions(file_path=self.machine_solution_file)
+        # User solutions take precedence over machine solutions for the same abbreviation.
+        self.solutions = {**self.machine_solutions, **self.user_solutions}
         self.automaton = self._build_automaton()
 
     def _build_automaton(self):
-        """Builds the Aho-Corasick automaton from user and machine solutions."""
+        """
+        Builds the Aho-Corasick automaton from user and machine solutions, or loads it
+        from the on-disk cache when the same solutions were already compiled.
+        """
+        digest = hashlib.sha256(orjson.dumps(self.solutions)).hexdigest()[:16]
+        cache_path = os.path.join(AUTOMATON_CACHE_DIR,
+                                  f"{AUTOMATON_CACHE_PREFIX}v{AUTOMATON_FORMAT_VERSION}.{digest}")
+        if os.path.exists(cache_path):
+            try:
+                return load_automaton(cache_path, pickle.loads)
+            except Exception as e:
+                self.logger.warning(f"Could not load cached automaton {cache_path}, rebuilding: {e}")
+
         automaton = Automaton()
-        for abbreviation, replacement in self.user_solutions.items():
-            automaton.add_word(abbreviation, replacement)
-        for abbreviation, replacement in self.machine_solutions.items():
-            automaton.add_word(abbreviation, replacement)
+        # The abbreviation length is stored with the replacement so matches need no len() call.
+        for abbreviation, replacement in self.solutions.items():
+            automaton.add_word(abbreviation, (len(abbreviation), replacement))
         automaton.make_automaton()
+
+        # Save under a per-process name first so concurrent workers never read a partial file.
+        try:
+            os.makedirs(AUTOMATON_CACHE_DIR, exist_ok=True)
+            temp_path = f"{cache_path}.{os.getpid()}"
+            automaton.save(temp_path, pickle.dumps)
+            os.replace(temp_path, cache_path)
+        except OSError as e:
+            self.logger.warning(f"Could not cache automaton to {cache_path}: {e}")
+        else:
+            self._remove_stale_automata(cache_path)
         return automaton
 
+    def _remove_stale_automata(self, cache_path):
+        """
+        Delete the automata cached for earlier solutions, which change with every
+        interactive session, so that only the current one is kept on disk. Files of
+        the current key (including other workers' temporary files) are left alone.
+        """
+        current_name = os.path.basename(cache_path)
+        with os.scandir(AUTOMATON_CACHE_DIR) as entries:
+            for entry in entries:
+                if entry.name.startswith(AUTOMATON_CACHE_PREFIX) and not entry.name.startswith(current_name):
+                    try:
+                        os.remove(entry.path)
+                    except OSError as e:
+                        self.logger.warning(f"Could not remove stale automaton {entry.path}: {e}")
+
     def apply_abbreviations(self, text: str) -> str:
-        """Applies the abbreviations to the text using Aho-Corasick algorithm."""
+        """
+        Applies the abbreviations to the text using Aho-Corasick algorithm.
+        Returns the original string object when nothing matched.
+        """
         result_parts = []
         last_end = 0
 
-        for end, abbreviation in self.automaton.iter(text):
-            replacement = self.user_solutions.get(abbreviation) or self.machine_solutions.get(abbreviation)
-            start = end - len(abbreviation) + 1
+        # iter_long yields the longest, non-overlapping matches from left to right.
+        for end, (length, replacement) in self.automaton.iter_long(text):
+            start = end - length + 1
             result_parts.append(text[last_end:start])
             result_parts.append(replacement)
             last_end = end + 1
 
+        if not result_parts:
+            return text
         result_parts.append(text[last_end:])
         return ''.join(result_parts)
 
     def process_file(self, file_path: str):
-        """Implement the logic to process a single file."""
-        #self.logger.debug(f"Processing file: {file_path}")
+        """Apply the replacements to a single file, saving it only if anything changed."""
+        self.logger.info(f"Processing file: {file_path}")
         try:
-            with open(file_path, 'r') as f:
-                content = f.read()
+            with open(file_path, 'rb') as f:
+                content = f.read().decode('utf-8')
 
-            content = self.apply_abbreviations(content)
+            # Apply replacements in a single Aho-Corasick pass; the same
+            # object comes back when the file holds no abbreviated words.
+            new_content = self.apply_abbreviations(content)
+            if new_content is not content:
+                self.logger.info(f"Applied replacements in file: {file_path}")
 
-            output_file_path = os.path.join(self.output_path, os.path.basename(file_path))
-            atomic_write_text(file_path=output_file_path, data=content)
-            #self.logger.debug(f"Output path: {self.output_path}")
+                # Save the modified content
+                output_file_path = os.path.join(self.output_path, os.path.basename(file_path))
+                atomic_write_bytes(file_path=output_file_path, data=new_content.encode('utf-8'))
 
         except Exception as e:
             self.logger.error(f"Failed to process {file_path}: {e}")
 
+    def parallel_process_files_threaded(self, files, workers=None):
+        """
+        Process files on a thread pool sharing this instance and its automaton.
+        Nothing is pickled and no process is started, which makes it the cheaper
+        option for small corpora and for platforms without fork.
+        """
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for _ in executor.map(self.process_file, files):
+                pass
+
     def parallel_process_files(self, files):
-        with Pool() as pool:
-            pool.map(self.process_file, files)
+        if len(files) < THREADED_FILE_LIMIT or "fork" not in multiprocessing.get_all_start_methods():
+            self.parallel_process_files_threaded(files)
+            return
+
+        # Route through the module-level pool so that workers use this instance
+        # without it being pickled into every task.
+        global file_processor_instance
+        file_processor_instance = self
+        process_files_in_parallel(files, os.cpu_count() or 1)
 
     def run(self):
         """Run the file processing."""
         self.logger.info("FileProcessor run method started.")
 
-        # Load abbreviation mappings from JSON files
-        user_solutions = self.user_solutions
-        machine_solutions = self.machine_solutions
-
-        # Create a set of all abbreviated words to speed up lookup
-        all_aws = set(user_solutions.keys()).union(set(machine_solutions.keys()))
-
         # Get the list of all files in the directory specified in config.toml
         input_path = self.config.get("paths", "input_path")
-        files_to_process = [os.path.join(input_path, f) for f in os.listdir(input_path) if os.path.isfile(os.path.join(input_path, f))]
+        with os.scandir(input_path) as entries:
+            files_to_process = [entry.path for entry in entries if entry.is_file()]
         # self.logger.info(f"Files to process: {files_to_process}")
 
-        for file_path in files_to_process:
-            self.logger.info(f"Processing file: {file_path}")
-            try:
-                with open(file_path, 'r') as f:
-                    content = f.read()
-
-                # Check if this file contains any abbreviated words
-                if any(aw in content for aw in all_aws):
-                    self.logger.info(f"Applying replacements in file: {file_path}")
-
-                    # Apply replacements
-                    for original, replacement in user_solutions.items():
-                        content = content.replace(original, replacement)
-                    for original, replacement in machine_solutions.items():
-                        content = content.replace(original, replacement)
-
-                    # Save the modified content
-                    output_file_path = os.path.join(self.output_path, os.path.basename(file_path))
-                    atomic_write_text(file_path=output_file_path, data=content)
-
-            except Exception as e:
-                self.logger.error(f"Failed to process {file_path}: {e}")
+        # Files are independent of one another, so they are processed concurrently.
+        self.parallel_process_files(files_to_process)
@@ -0,0 +1,49 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Number of directories listed concurrently while walking the input tree
+WALK_WORKERS = 16
+
+
+def _scan_directory(dir_path, include_hidden):
+    """
+    List one directory, returning the text files it holds and its subdirectories.
+    os.scandir reports each entry's type with the listing itself, so no extra
+    stat call is made per file. A directory that cannot be listed is logged and
+    skipped, as os.walk does, rather than aborting the whole walk.
+    """
+    files = []
+    subdirectories = []
+    try:
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirectories.append(entry.path)
+                elif entry.name.endswith(".txt") and (include_hidden or not entry.name.startswith('.')) \
+                        and entry.is_file():
+                    files.append(entry.path)
+    except OSError as e:
+        logger.error(f"Error listing directory {dir_path}: {e}")
+        return [], []
+    return files, subdirectories
+
+
+def iter_text_files(dir_path, include_hidden=True, workers=WALK_WORKERS):
+    """
+    Yield the paths of the text files in a directory and its subdirectories.
+    Directories are listed on a thread pool, so that on slow or networked storage
+    several listings are waited on at once; files are yielded as each listing
+    completes, in no particular order.
+    """
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {executor.submit(_scan_directory, dir_path, include_hidden)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                files, subdirectories = future.result()
+                for subdirectory in subdirectories:
+                    pending.add(executor.submit(_scan_directory, subdirectory, include_hidden))
+                yield from files
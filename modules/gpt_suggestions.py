@@ -1,14 +1,100 @@
+import atexit
+import hashlib
 import os
 import logging
-from openai import OpenAI
-from config import Config
+import orjson
+import sqlite3
+import threading
+from concurrent.futures import Future
+from typing import NamedTuple
+
+# Number of context characters kept on each side of the problematic word
+CONTEXT_WINDOW = 200
+
+# Default number of problematic words packed into a single batched request
+BATCH_SIZE = 10
+
+# The instructions never vary between requests and always come first, so that every
+# prompt shares a byte-identical prefix the provider can serve from its prompt cache.
+# Only the user message carries the per-word data.
+SYSTEM_PROMPT = (
+    "You are a scholar of early modern languages deciphering abbreviations in Renaissance printed books. "
+    "Output: one line of comma-separated candidate words for the problematic word."
+)
+BATCH_SYSTEM_PROMPT = (
+    "You are a scholar of early modern languages deciphering abbreviations in Renaissance printed books. "
+    "The input is a JSON array of problematic words with their context. "
+    "Output only a JSON array with one object per input item: "
+    '{"id": <item id>, "suggestions": "<comma-separated candidate words>"}.'
+)
+
+class LLMParams(NamedTuple):
+    """Request settings resolved once from the configuration."""
+    model: str
+    max_tokens: int
+    temperature: float
+    concurrency: int
+    batch_size: int
+    max_retries: int
 
 class MissingAPIKeyError(Exception):
     def __init__(self):
         message = "OpenAI API key not found in environment variables. Please set the OPENAI_API_KEY environment variable."
         super().__init__(message)
 
+class SuggestionCache:
+    """
+    Persistent cache of GPT suggestions, keyed by model, word and a hash of the
+    whitespace-normalized context. Stored in SQLite so it survives restarts,
+    with an in-memory dictionary in front of it for repeated lookups.
+    """
+    def __init__(self, file_path):
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._memory = {}
+        self._connection = sqlite3.connect(file_path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS suggestions (key TEXT PRIMARY KEY, suggestion TEXT NOT NULL)"
+        )
+        self._connection.commit()
+
+    @staticmethod
+    def make_key(model, word, context):
+        normalized_context = " ".join(context.split())
+        context_hash = hashlib.sha256(normalized_context.encode("utf-8")).hexdigest()
+        return f"{model}|{word}|{context_hash}"
+
+    def get(self, key):
+        suggestion = self._memory.get(key)
+        if suggestion is not None:
+            return suggestion
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT suggestion FROM suggestions WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        self._memory[key] = row[0]
+        return row[0]
+
+    def set(self, key, suggestion):
+        self._memory.setdefault(key, suggestion)
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR IGNORE INTO suggestions (key, suggestion) VALUES (?, ?)", (key, suggestion)
+            )
+            self._connection.commit()
+
 class GPTSuggestions:
+    # OpenAI clients keep a pool of keep-alive connections, so a single client per
+    # API key is shared by every instance rather than reconnecting for each one.
+    _clients = {}
+    _clients_lock = threading.Lock()
+    # Client keys whose connection has already been pre-warmed
+    _prewarmed = set()
+
     def __init__(self, config):
         self.logger = logging.getLogger(__name__)
         logging_level = getattr(logging, config.debug_level, logging.WARNING)
@@ -18,54 +104,238 @@ class GPTSuggestions:
         if self.api_key is None:
             raise MissingAPIKeyError()
 
-        # Instantiate the OpenAI client
-        self.client = OpenAI(api_key=self.api_key)
-
         # Get the language model type from config
         self.model_type = config.get('OpenAI_integration', 'language_model')
-        self.model = "gpt-4" if self.model_type == "GPT-4" else "gpt-3.5-turbo"
+        self.params = LLMParams(
+            model="gpt-4" if self.model_type == "GPT-4" else "gpt-3.5-turbo",
+            max_tokens=50,
+            temperature=0,
+            concurrency=config.get('OpenAI_integration', 'concurrency', 8),
+            batch_size=config.get('OpenAI_integration', 'batch_size', 1),
+            # Rate-limited (429) and transient failures are retried by the client itself,
+            # with exponential backoff that honours the server's Retry-After header.
+            max_retries=config.get('OpenAI_integration', 'max_retries', 6),
+        )
+        # The system messages never change, so they are built once and shared by every request.
+        self._system_message = {"role": "system", "content": SYSTEM_PROMPT}
+        self._batch_system_message = {"role": "system", "content": BATCH_SYSTEM_PROMPT}
+        # Request parameters shared by every single-word call, built once:
+        # one deterministic completion (nothing sampled only to be thrown away),
+        # stopped server-side at the end of the first line, which is all that is used.
+        self._request_options = {
+            "model": self.params.model,
+            "max_tokens": self.params.max_tokens,
+            "n": 1,
+            "temperature": self.params.temperature,
+            "stop": ["\n"],
+        }
+        self.cache = SuggestionCache(config.get('data', 'gpt_cache_path', 'data/gpt_cache.sqlite'))
+
+        # Create the shared client, which every request goes through, and connect it in the
+        # background while the rest of the application starts up. Done once per client.
+        client_key = (self.api_key, self.params.max_retries)
+        with self._clients_lock:
+            prewarm = client_key not in self._prewarmed
+            self._prewarmed.add(client_key)
+        if prewarm:
+            threading.Thread(target=self._prewarm, daemon=True).start()
+
+    @property
+    def client(self):
+        """The shared OpenAI client, created on first use rather than on the constructing thread."""
+        return self._shared_client(self.api_key, self.params.max_retries)
+
+    @classmethod
+    def _shared_client(cls, api_key, max_retries):
+        with cls._clients_lock:
+            client = cls._clients.get((api_key, max_retries))
+            if client is None:
+                # Imported here: loading the openai package is costly and only needed once a request is made.
+                from openai import OpenAI
+                client = cls._clients[(api_key, max_retries)] = OpenAI(api_key=api_key, max_retries=max_retries)
+        return client
+
+    def _prewarm(self):
+        """
+        Open the client's connection with the cheapest authenticated call, so that
+        the TLS handshake is not paid by the first real request.
+        """
+        try:
+            self.client.models.list()
+        except Exception:
+            self.logger.debug("Could not pre-warm the OpenAI connection", exc_info=True)
+
+    @classmethod
+    def close_clients(cls):
+        """Close the shared clients, releasing their pooled keep-alive connections."""
+        for client in cls._clients.values():
+            client.close()
+        cls._clients.clear()
+
+    @staticmethod
+    def _trim_context(word, context, window=CONTEXT_WINDOW):
+        """Keep only `window` characters of context on each side of the word."""
+        position = context.find(word)
+        if position == -1:
+            return context[:2 * window]
+        start = max(0, position - window)
+        return context[start:position + len(word) + window]
+
+    def _build_messages(self, word, context):
+        """Set up the prompt for GPT."""
+        user_message = {
+            "role": "user",
+            "content": f"Problematic Word: {word}\nContext: {context}"
+        }
+        return [self._system_message, user_message]
+
+    def _build_batch_messages(self, items):
+        """Set up a prompt covering several (word, context) pairs, identified by their index."""
+        payload = [{"id": index, "word": word, "context": context} for index, (word, context) in enumerate(items)]
+        user_message = {
+            "role": "user",
+            "content": orjson.dumps(payload).decode('utf-8')
+        }
+        return [self._batch_system_message, user_message]
+
+    def _extract_suggestion(self, response):
+        """Check and extract the suggestion from an API response, or None if there is none."""
+        # Log the full API response; its repr is only built when INFO is enabled
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info("API Response: %s", response)
+
+        if response.choices:
+            # Directly accessing attributes of the Choice object
+            message_content = response.choices[0].message.content if response.choices[0].message else ""
+            # Assuming the first line contains the comma-separated word suggestions
+            return message_content.split('\n')[0]
+        return None
+
+    @staticmethod
+    def _parse_batch_answer(content):
+        """
+        Parse the JSON array of a batched answer. Models often wrap it in a
+        Markdown code fence or precede it with a sentence, so only the text
+        from the first '[' to the last ']' is parsed.
+        """
+        start = content.find('[')
+        end = content.rfind(']')
+        if start == -1 or end < start:
+            raise ValueError(f"No JSON array in the batched answer: {content!r}")
+        return orjson.loads(content[start:end + 1])
+
+    def _store_suggestion(self, key, suggestion):
+        """Cache a suggestion, or return the placeholder when the API gave none."""
+        if suggestion is None:
+            return "No suggestions available"
+        self.cache.set(key, suggestion)
+        return suggestion
 
     def get_suggestion(self, word, context):
+        context = self._trim_context(word, context)
+        key = self.cache.make_key(self.params.model, word, context)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
         try:
-            # Setting up the prompt for GPT
-            system_message = {
-                "role": "system",
-                "content": "You are a seasoned scholar in the humanities specialized in early modern languages. Your role is to help decipher abbreviations from Renaissance and early modern printed books. Provide a concise, comma-separated list of possible word suggestions for the following problematic word and context."
-            }
-            user_message = {
-                "role": "user",
-                "content": f"Problematic Word: {word}\nContext: {context}"
-            }
-
-            # Making the API call
             response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[system_message, user_message],
-                max_tokens=50
+                messages=self._build_messages(word, context),
+                **self._request_options
             )
-
-            # Log the full API response
-            self.logger.info(f"API Response: {response}")
-
-            # Checking and extracting the response
-            if response.choices:
-                # Directly accessing attributes of the Choice object
-                message_content = response.choices[0].message.content if response.choices[0].message else ""
-                # Assuming the first line contains the comma-separated word suggestions
-                return message_content.split('\n')[0]
-            else:
-                return "No suggestions available"
+            return self._store_suggestion(key, self._extract_suggestion(response))
         except Exception as e:
             self.logger.exception("Error in generating GPT suggestion")
             return f"Error in generating suggestion: {e}"
 
+    def get_suggestions_batch(self, items, batch_size=None):
+        """
+        Get suggestions for a list of (word, context) pairs, packing up to
+        `batch_size` uncached pairs into each request so that a single round
+        trip answers several words. Suggestions are returned in the same order
+        as the items; repeated pairs are only requested once.
+        """
+        batch_size = batch_size or self.params.batch_size or BATCH_SIZE
+        results = [None] * len(items)
+        # Uncached requests by cache key, so that repeated pairs are only asked once
+        pending = {}
+        for index, (word, context) in enumerate(items):
+            context = self._trim_context(word, context)
+            key = self.cache.make_key(self.params.model, word, context)
+            if key in pending:
+                pending[key][0].append(index)
+                continue
+            cached = self.cache.get(key)
+            if cached is not None:
+                results[index] = cached
+            else:
+                pending[key] = ([index], key, word, context)
 
-    def print_suggestion(self, context, suggestion):
-        print("\n\n")
-        print(f"[bold]GPT Suggestion:[/bold] {suggestion}")
-        print("\n\n")
+        pending = list(pending.values())
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            try:
+                response = self.client.chat.completions.create(
+                    model=self.params.model,
+                    messages=self._build_batch_messages([(word, context) for _, _, word, context in batch]),
+                    max_tokens=self.params.max_tokens * len(batch),
+                    n=1,
+                    temperature=self.params.temperature
+                )
+                if self.logger.isEnabledFor(logging.INFO):
+                    self.logger.info("API Response: %s", response)
+                answers = {entry["id"]: entry.get("suggestions")
+                           for entry in self._parse_batch_answer(response.choices[0].message.content)}
+            except Exception as e:
+                self.logger.exception("Error in generating batched GPT suggestions")
+                for indices, _, _, _ in batch:
+                    for index in indices:
+                        results[index] = f"Error in generating suggestion: {e}"
+                continue
 
-    def get_and_print_suggestion(self, context):
-        suggestion = self.get_suggestion(context)
-        self.print_suggestion(context, suggestion)
-        return suggestion
+            for batch_id, (indices, key, _, _) in enumerate(batch):
+                suggestion = answers.get(batch_id)
+                if isinstance(suggestion, list):
+                    suggestion = ", ".join(suggestion)
+                suggestion = self._store_suggestion(key, suggestion or None)
+                for index in indices:
+                    results[index] = suggestion
+        return results
+
+    def submit_suggestions(self, executor, items):
+        """
+        Submit the suggestions for a list of (word, context) pairs to `executor`,
+        in order, and return one future per item, so that a caller can show the
+        first answers while the later ones are still being requested. With a
+        batch_size above 1, consecutive items share a batched request; repeated
+        pairs are only requested once.
+        """
+        if self.params.batch_size <= 1:
+            futures = {}
+            for item in items:
+                if item not in futures:
+                    futures[item] = executor.submit(self.get_suggestion, *item)
+            return [futures[item] for item in items]
+
+        item_futures = []
+        for start in range(0, len(items), self.params.batch_size):
+            batch = items[start:start + self.params.batch_size]
+            batch_item_futures = [Future() for _ in batch]
+            executor.submit(self.get_suggestions_batch, batch).add_done_callback(
+                lambda batch_future, targets=batch_item_futures: self._resolve_items(batch_future, targets)
+            )
+            item_futures.extend(batch_item_futures)
+        return item_futures
+
+    @staticmethod
+    def _resolve_items(batch_future, item_futures):
+        """Hand the results (or the failure) of a batched request to the futures of its items."""
+        try:
+            results = batch_future.result()
+        except BaseException as e:
+            for item_future in item_futures:
+                item_future.set_exception(e)
+            return
+        for item_future, result in zip(item_futures, results):
+            item_future.set_result(result)
+
+atexit.register(GPTSuggestions.close_clients)
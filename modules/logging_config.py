@@ -1,9 +1,13 @@
+import atexit
 import logging
+import multiprocessing
 import os
-from config import Config
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from config import get_config
 
-# Instantiate the Config class
-config = Config()
+# Shared configuration instance
+config = get_config()
 
 # Define the logging format
 log_format = "%(asctime)s - %(levelname)s - %(module)s: %(message)s"
@@ -15,13 +19,43 @@ logging_level = getattr(logging, config.debug_level, logging.WARNING)
 if not os.path.exists("logs"):
     os.makedirs("logs")
 
+file_handler = logging.FileHandler("logs/amanuensis.log", mode="a")
+file_handler.setFormatter(logging.Formatter(log_format))
+
+if multiprocessing.parent_process() is None:
+    # In the main process, records are written to the log file by a background
+    # thread, so that logging calls never wait on disk I/O.
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    # The listener's file handler applies the full format; the queue only carries the message.
+    queue_handler.setFormatter(logging.Formatter("%(message)s"))
+    queue_listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+    queue_listener.start()
+    atexit.register(queue_listener.stop)
+    log_file_handler = queue_handler
+else:
+    # Worker processes may exit without running atexit, which would lose queued records.
+    log_file_handler = file_handler
+
+
+def _write_log_file_directly():
+    """In a forked worker, the listener thread does not exist: write to the file directly."""
+    root_logger = logging.getLogger()
+    if log_file_handler in root_logger.handlers:
+        root_logger.removeHandler(log_file_handler)
+        root_logger.addHandler(file_handler)
+
+
+if log_file_handler is not file_handler:
+    os.register_at_fork(after_in_child=_write_log_file_directly)
+
 # Set up the root logger
 logging.basicConfig(
     level=logging_level,
     format=log_format,
     handlers=[
         logging.StreamHandler(),
-        logging.FileHandler("logs/amanuensis.log", mode="a")
+        log_file_handler
     ]
 )
 
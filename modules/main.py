@@ -13,20 +13,18 @@ remaining edge cases.
 import os
 import signal
 import sys
+import threading
 from typing import Any
 
-from art import text2art
-
-from atomic_update import atomic_write_json
-from config import Config
+from atomic_update import atomic_write_json_many
+from config import get_config
 from conflict_resolver import ConflictResolver
 from dynamic_word_normalization1 import DynamicWordNormalization1
 from dynamic_word_normalization2 import DynamicWordNormalization2
 from dynamic_word_normalization2 import UserQuitException
-from dynamic_word_normalization3 import DynamicWordNormalization3
 from logging_config import get_logger
 from unicode_replacement import UnicodeReplacement
-from file_processor import FileProcessor
+from file_utils import iter_text_files
 
 
 class MainApp:
@@ -36,15 +34,16 @@ class MainApp:
         self.logger = get_logger(__name__)
         self.ongoing_processes = []
         self.pending_json_data = {}
-        self.config = Config()
+        self.shutdown_requested = threading.Event()
+        self.shutting_down = False
+        self.config = get_config()
         self.config.get("settings", "logging_level")
 
     def save_json_data(self):
         """
         Save pending json data to json disk.
         """
-        for filename, data in self.pending_json_data.items():
-            atomic_write_json(filename, data)
+        atomic_write_json_many(self.pending_json_data)
         self.logger.info("Saved pending json data to disk.")
 
     def terminate_ongoing_processes(self):
@@ -58,10 +57,25 @@ class MainApp:
     def signal_handler(self):
         """
         Handle Ctrl+C signal.
+        The first press only requests a shutdown, which the run carries out between
+        stages; a second press shuts down immediately.
         """
         self.logger.info("Ctrl+C pressed.")
+        if self.shutdown_requested.is_set():
+            self.shutdown()
+        self.shutdown_requested.set()
+        print("\n\nYou pressed Ctrl+C. Amanuensis will stop after the current stage; press Ctrl+C again to quit now.")
+
+    def shutdown(self):
+        """
+        Save pending data, stop ongoing processes and exit.
+        Runs only once: a Ctrl+C arriving while it saves does not start a second save.
+        """
+        if self.shutting_down:
+            return
+        self.shutting_down = True
         self.save_json_data()
-        print("\n\nYou pressed Ctrl+C. Initiating shutdown...")
+        print("\n\nInitiating shutdown...")
         self.terminate_ongoing_processes()
         self.logger.info("Cleanup complete. Exiting.")
         print("Au revoir!")
@@ -74,6 +88,8 @@ class Amanuensis:
         Initialize Amanuensis.
         """
         self.logger = get_logger(__name__)
+        # Imported here: art loads its whole font collection, which is only needed for the banner.
+        from art import text2art
         print(text2art("Amanuensis"))
         self.main_app = main_app_instance
         self.config = config
@@ -93,6 +109,11 @@ class Amanuensis:
                 )
         self.conflict_resolver = ConflictResolver(self.config)
 
+        # Settings used by the stages below, resolved once
+        self.input_path = self.config.get("paths", "input_path")
+        self.output_path = self.config.get("paths", "output_path")
+        self.replacements_on = self.config.get("unicode_replacements", "replacements_on")
+        self.unresolved_aws_path = self.config.get("data", "unresolved_aws_path")
 
     @property
     def word_normalization(self):
@@ -100,24 +121,37 @@ class Amanuensis:
             self._word_normalization = DynamicWordNormalization1(self.config)
         return self._word_normalization
 
+    def check_shutdown(self):
+        """
+        Shut down if Ctrl+C was pressed during the previous stage.
+        """
+        if self.main_app.shutdown_requested.is_set():
+            self.logger.info("Shutdown requested, stopping between stages.")
+            self.main_app.shutdown()
+
     def run(self):
         """
         Execution sequence of Amanuenis.
         """
-        if self.config.get("unicode_replacements", "replacements_on"):
+        if self.replacements_on:
             self.run_unicode_replacement()
+            self.check_shutdown()
 
         # DWN1.1
         self.logger.info("Starting Dynamic Word Normalization Phase 1.1...")
         self.run_word_normalization()
+        self.check_shutdown()
         # DWN1.2
         self.logger.info("Starting Dynamic Word Normalization Phase 1.2...")
-        unresolved_path = self.config.get("data", "unresolved_aws_path")
-        self.word_normalization2.process_unresolved_aws(unresolved_path)
+        self.word_normalization2.process_unresolved_aws(self.unresolved_aws_path)
+        self.check_shutdown()
         # DWN2
         self.logger.info("Starting Dynamic Word Normalization Phase 2...")
+        # The later stages are only imported once the run reaches them.
+        from dynamic_word_normalization3 import DynamicWordNormalization3
         self.word_normalization3 = DynamicWordNormalization3(self.config)
         self.word_normalization3.analyze_difficult_passages()
+        self.check_shutdown()
 
         # Conflict Resolution
         proceed = input(
@@ -133,6 +167,7 @@ class Amanuensis:
         self.logger.info("Resolving conflicts between Machine and User Solutions...")
         self.conflict_resolver.detect_and_resolve_conflicts()
         self.logger.info("Conflict Resolution Complete.")
+        self.check_shutdown()
 
         if proceed.lower() != "y":
             print("Exiting.")
@@ -142,11 +177,10 @@ class Amanuensis:
             sys.exit(0)
 
         self.logger.info("Starting file processing...")
+        from file_processor import FileProcessor
         processor = FileProcessor(config_file='config.toml',
-                                      user_solution_file=os.path.join(self.config.get('paths', 'output_path'),
-                                                                      'data/user_solution.json'),
-                                      machine_solution_file=os.path.join(self.config.get('paths', 'output_path'),
-                                                                         'data/machine_solution.json'))
+                                      user_solution_file=os.path.join(self.output_path, 'data/user_solution.json'),
+                                      machine_solution_file=os.path.join(self.output_path, 'data/machine_solution.json'))
         processor.run()
         self.logger.info("File processing complete.")
 
@@ -155,34 +189,18 @@ class Amanuensis:
         Perform Unicode replacements on all text files in the input directory.
         """
         self.logger.info("Starting Unicode Replacement...")
-        input_path = self.config.get("paths", "input_path")
-        file_paths = Amanuensis.get_all_text_files(input_path)
-
         # print("Launch process_files.")
-        self.unicode_replacement.process_files(file_paths)
+        # Paths are streamed to the workers while the input directory is still being walked;
+        # process_files saves the change log itself once the last file is done.
+        self.unicode_replacement.process_files(iter_text_files(self.input_path))
         # print("process_files done.")
-        self.unicode_replacement.save_log()
 
     def run_word_normalization(self):
         """
         Perform Dynamic Word Normalization on all text files in the input directory.
         """
         # self.logger.info("run_word_normalization...")
-        input_directory = self.config.get("paths", "input_path")
-
-        self.word_normalization.preprocess_directory(input_directory)
-
-    @staticmethod
-    def get_all_text_files(dir_path):
-        """
-        Get all text files in the specified directory and its subdirectories.
-        """
-        text_files = []
-        for subdir, _, files in os.walk(dir_path):
-            for file in files:
-                if file.endswith(".txt"):
-                    text_files.append(os.path.join(subdir, file))
-        return text_files
+        self.word_normalization.preprocess_directory(self.input_path)
 
 
 if __name__ == "__main__":
@@ -1,14 +1,38 @@
 import orjson
 import os
+import signal
+import tempfile
 from multiprocessing import Pool
 from time import time
-from typing import List, Optional
+from typing import Optional
 
 from rich.console import Console
 from rich.progress import Progress
 
 from config import Config
 
+# Number of files sent to a worker at a time
+FILE_CHUNKSIZE = 8
+
+# Permissions of a newly created output file, as open() would give it; mkstemp uses 0600
+_umask = os.umask(0)
+os.umask(_umask)
+OUTPUT_FILE_MODE = 0o666 & ~_umask
+
+# The UnicodeReplacement instance of a worker process, set once by _init_worker
+worker_instance = None
+
+
+def _init_worker(instance):
+    global worker_instance
+    # Only the main process reacts to Ctrl+C.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    worker_instance = instance
+
+
+def _replace_in_worker(input_file):
+    return worker_instance.replace(input_file)
+
 
 class UnicodeReplacement:
     def __init__(self, config: Config, num_workers: Optional[int] = None):
@@ -24,50 +48,109 @@ class UnicodeReplacement:
             self.output_path = config.get("paths", "output_path")
         except KeyError as e:
             raise ValueError(f"Missing key in config file: {e}")
+        self._build_translation_tables()
+
+    def _build_translation_tables(self):
+        """
+        Precompute str.translate tables so that single characters are deleted or
+        replaced in one C-level pass per line instead of one str.replace per character.
+        Entries are applied in configuration order, so only the single characters that
+        follow the last multi-character entry can be folded into a table: everything
+        before them has already been applied, exactly as in the sequential loop.
+        Replacements are only folded when none of those keys occurs in another of
+        their keys or values, i.e. when applying them at once changes nothing.
+        """
+        deletions = list(self.characters_to_delete)
+        split = self._table_split(deletions)
+        self._ordered_deletions = deletions[:split]
+        self._table_deletions = list(dict.fromkeys(deletions[split:]))
+        self._table_deletion_set = set(self._table_deletions)
+        self._delete_table = str.maketrans(dict.fromkeys(self._table_deletions))
+
+        replacements = list(self.characters_to_replace.items())
+        split = self._table_split([original for original, _ in replacements])
+        keys = [original for original, _ in replacements[split:]]
+        values = [replacement for _, replacement in replacements[split:]]
+        independent = not any(
+            key in other
+            for i, key in enumerate(keys)
+            for other in keys[:i] + keys[i + 1:] + values
+        )
+        if not independent:
+            split = len(replacements)
+        self._ordered_replacements = replacements[:split]
+        self._table_replacements = replacements[split:]
+        self._table_replacement_set = {original for original, _ in self._table_replacements}
+        self._replace_table = str.maketrans(dict(self._table_replacements))
+
+    @staticmethod
+    def _table_split(entries) -> int:
+        """Index of the first entry after the last multi-character one."""
+        return max((i + 1 for i, entry in enumerate(entries) if len(entry) != 1), default=0)
 
     def replace(self, input_file_path: str):
         """Applies Unicode replacements on the given file and saves the modified text."""
         local_log = []
-        with open(input_file_path, "r", encoding="utf-8") as file:
-            lines = file.readlines()
-        modified_lines = [self._modify_line(line, i+1, input_file_path, local_log) for i, line in enumerate(lines)]
-        self._write_output_file(input_file_path, modified_lines)
+        file_name = os.path.basename(input_file_path)
+        output_file_path = os.path.join(self.output_path, file_name)
+        # Stream line by line so memory stays bounded by the longest line, not the file size.
+        # Lines go to a temporary file that only replaces the output once the whole input
+        # has been read, so a failure never leaves a truncated output (or input, when both
+        # paths are the same directory).
+        fd, temp_path = tempfile.mkstemp(dir=self.output_path, prefix='.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as outfile, \
+                    open(input_file_path, "r", encoding="utf-8") as infile:
+                for i, line in enumerate(infile, start=1):
+                    outfile.write(self._modify_line(line, i, file_name, local_log))
+            os.chmod(temp_path, OUTPUT_FILE_MODE)
+            os.replace(temp_path, output_file_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
         return local_log
 
-    def _modify_line(self, line: str, line_num: int, input_file_path: str, local_log: list) -> str:
+    def _modify_line(self, line: str, line_num: int, file_name: str, local_log: list) -> str:
         modified_line = line
         if self.replacements_on:
-            modified_line = self._delete_chars(modified_line, line_num, input_file_path, local_log)
-            modified_line = self._replace_chars(modified_line, line_num, input_file_path, local_log)
+            modified_line = self._delete_chars(modified_line, line_num, file_name, local_log)
+            modified_line = self._replace_chars(modified_line, line_num, file_name, local_log)
         return modified_line
 
-    def _delete_chars(self, line: str, line_num: int, input_file_path: str, local_log: list) -> str:
-        for char in self.characters_to_delete:
+    def _delete_chars(self, line: str, line_num: int, file_name: str, local_log: list) -> str:
+        for char in self._ordered_deletions:
             if char in line:
-                UnicodeReplacement.log_change(input_file_path, line_num, char, "deleted", local_log)
+                UnicodeReplacement.log_change(file_name, line_num, char, "deleted", local_log)
                 line = line.replace(char, "")
+        found = self._table_deletion_set.intersection(line)
+        if found:
+            for char in self._table_deletions:
+                if char in found:
+                    UnicodeReplacement.log_change(file_name, line_num, char, "deleted", local_log)
+            line = line.translate(self._delete_table)
         return line
 
-    def _replace_chars(self, line: str, line_num: int, input_file_path: str, local_log: list) -> str:
-        for original, replacement in self.characters_to_replace.items():
+    def _replace_chars(self, line: str, line_num: int, file_name: str, local_log: list) -> str:
+        for original, replacement in self._ordered_replacements:
             if original in line:
-                UnicodeReplacement.log_change(input_file_path, line_num, original, replacement, local_log)
+                UnicodeReplacement.log_change(file_name, line_num, original, replacement, local_log)
                 line = line.replace(original, replacement)
+        found = self._table_replacement_set.intersection(line)
+        if found:
+            for original, replacement in self._table_replacements:
+                if original in found:
+                    UnicodeReplacement.log_change(file_name, line_num, original, replacement, local_log)
+            line = line.translate(self._replace_table)
         return line
 
-    def _write_output_file(self, input_file_path: str, modified_lines: List[str]):
-        output_file_path = os.path.join(self.output_path, os.path.basename(input_file_path))
-        with open(output_file_path, "w", encoding="utf-8") as file:
-            file.writelines(modified_lines)
-
     @staticmethod
-    def log_change(input_file_path: str, line_num: int, original: str, replacement: str, local_log: list = None):
+    def log_change(file_name: str, line_num: int, original: str, replacement: str, local_log: list = None):
         """
         Log a replacement or deletion to the log list.
         """
         log_entry = {
             "timestamp": time(),
-            "file_name": os.path.basename(input_file_path),
+            "file_name": file_name,
             "line_number": line_num,
             "original": original,
             "replacement": replacement,
@@ -89,20 +172,29 @@ class UnicodeReplacement:
 
         deleted_count = sum(1 for entry in self.log if entry["replacement"] == "deleted")
         replaced_count = sum(1 for entry in self.log if entry["replacement"] != "deleted")
-        files_changed_count = len(set(entry["file_name"] for entry in self.log))
+        files_changed_count = len({entry["file_name"] for entry in self.log})
 
         console.print(f"\n[bold cyan]Summary of Unicode Replacement Phase:[/bold cyan]")
         console.print(f"[green]Characters deleted:[/green] {deleted_count}")
         console.print(f"[green]Characters replaced:[/green] {replaced_count}")
         console.print(f"[green]Files Changed:[/green] {files_changed_count}")
 
-    def process_files(self, input_files):
-        """Apply Unicode replacements on multiple files using multiprocessing."""
+    def process_files(self, input_files, total: Optional[int] = None):
+        """
+        Apply Unicode replacements on multiple files using multiprocessing.
+        input_files may be any iterable, such as a generator still walking the
+        input directory: workers start on the first files while the rest are found.
+        The progress total is taken from `total`, or from len() when available.
+        """
+        if total is None and hasattr(input_files, "__len__"):
+            total = len(input_files)
         global_log = []
         with Progress() as progress:
-            task = progress.add_task("[green]Processing...", total=len(input_files))
-            with Pool() as pool:
-                for local_log in pool.imap_unordered(self.replace, input_files):
+            task = progress.add_task("[green]Processing...", total=total)
+            # The instance and its translation tables reach each worker once, through the
+            # initializer, rather than being pickled with every chunk of paths.
+            with Pool(self.num_workers, initializer=_init_worker, initargs=(self,)) as pool:
+                for local_log in pool.imap_unordered(_replace_in_worker, input_files, chunksize=FILE_CHUNKSIZE):
                     global_log.extend(local_log)
                     progress.update(task, advance=1)
         self.log = global_log
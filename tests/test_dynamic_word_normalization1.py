@@ -1,4 +1,9 @@
-from unittest import TestCase
+import os
+import tempfile
+from unittest import TestCase, mock
+
+from modules import dynamic_word_normalization1
+from modules.dynamic_word_normalization1 import UnresolvedAW, process_file
 
 
 class TestDynamicWordNormalization1(TestCase):
@@ -33,10 +38,20 @@ class TestDynamicWordNormalization1(TestCase):
         self.fail()
 
     def test_process_file(self):
-        self.fail()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, 'sample.txt')
+            with open(file_path, 'w', encoding='utf-8') as f:
+                f.write("a b$ c\nd the$ e\nf b$ g\n")
 
-    def test_preprocess_directory(self):
-        self.fail()
+            with mock.patch.object(dynamic_word_normalization1, 'consult_wordnet', return_value=None):
+                unresolved_aws = process_file(file_path, {'the$': 'them'}, {}, 1,
+                                              os.path.join(temp_dir, 'machine_solution.json'))
+
+        # The repeated token is reported on its own line each time; the solved one is not reported.
+        self.assertEqual(unresolved_aws, [
+            UnresolvedAW(file_path, 1, 1, 'b$', 'a b$ c'),
+            UnresolvedAW(file_path, 3, 1, 'b$', 'f b$ g'),
+        ])
 
-    def test_total_files(self):
+    def test_preprocess_directory(self):
         self.fail()
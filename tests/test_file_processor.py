@@ -0,0 +1,45 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import orjson
+
+from modules import file_processor
+from modules.file_processor import FileProcessor
+
+
+class TestFileProcessor(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        cache_patch = mock.patch.object(file_processor, 'AUTOMATON_CACHE_DIR', self.temp_dir.name)
+        cache_patch.start()
+        self.addCleanup(cache_patch.stop)
+
+    def make_processor(self, user_solutions, machine_solutions):
+        user_solution_file = os.path.join(self.temp_dir.name, 'user_solution.json')
+        machine_solution_file = os.path.join(self.temp_dir.name, 'machine_solution.json')
+        with open(user_solution_file, 'wb') as f:
+            f.write(orjson.dumps(user_solutions))
+        with open(machine_solution_file, 'wb') as f:
+            f.write(orjson.dumps(machine_solutions))
+        return FileProcessor(user_solution_file=user_solution_file, machine_solution_file=machine_solution_file)
+
+    def test_apply_abbreviations_overlapping_keys(self):
+        processor = self.make_processor({'co$': 'con', 'o$': 'om'}, {})
+        # 'co$' is replaced whole; the 'o$' inside it is not replaced a second time.
+        self.assertEqual(processor.apply_abbreviations('co$ o$ co$tra'), 'con om contra')
+
+    def test_apply_abbreviations_user_solutions_take_precedence(self):
+        processor = self.make_processor({'the$': 'them'}, {'the$': 'then', 'a$d': 'and'})
+        self.assertEqual(processor.apply_abbreviations('the$ a$d'), 'them and')
+
+    def test_apply_abbreviations_returns_unchanged_text(self):
+        processor = self.make_processor({'co$': 'con'}, {})
+        text = 'nothing to replace here'
+        self.assertIs(processor.apply_abbreviations(text), text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,12 +7,16 @@ sys.path.append("/Users/clem/GitHub/Amanuensis/modules")
 
 
 class MockConfig:
+    def __init__(self, characters_to_delete=None, characters_to_replace=None):
+        self.characters_to_delete = ['a'] if characters_to_delete is None else characters_to_delete
+        self.characters_to_replace = {'b': 'c'} if characters_to_replace is None else characters_to_replace
+
     def get(self, section, key):
         mock_data = {
             'unicode_replacements': {
                 'replacements_on': True,
-                'characters_to_delete': ['a'],
-                'characters_to_replace': {'b': 'c'}
+                'characters_to_delete': self.characters_to_delete,
+                'characters_to_replace': self.characters_to_replace
             },
             'paths': {
                 'output_path': '/tests/output'
@@ -26,6 +30,26 @@ class TestUnicodeReplacement(unittest.TestCase):
         mock_config = MockConfig()
         ur_instance = UnicodeReplacement(mock_config)
 
+    def modify(self, line, characters_to_delete=None, characters_to_replace=None):
+        ur_instance = UnicodeReplacement(MockConfig(characters_to_delete, characters_to_replace))
+        local_log = []
+        modified_line = ur_instance._modify_line(line, 1, 'test.txt', local_log)
+        return modified_line, [(entry['original'], entry['replacement']) for entry in local_log]
+
+    def test_replacement_forming_a_later_key(self):
+        # 'x' becomes 'b', which then forms the later key 'ab'
+        self.assertEqual(self.modify('ax', [], {'x': 'b', 'ab': 'Q'}),
+                         ('Q', [('x', 'b'), ('ab', 'Q')]))
+
+    def test_deletion_forming_a_later_key(self):
+        # Deleting 'x' joins 'a' and 'b' into the later deletion 'ab'
+        self.assertEqual(self.modify('axbarb', ['x', 'ab'], {}),
+                         ('arb', [('x', 'deleted'), ('ab', 'deleted')]))
+
+    def test_single_characters_after_multi_character_keys(self):
+        self.assertEqual(self.modify('&c. \u00b6ꝑ', ['\u00b6'], {'&c.': 'etc.', 'ꝑ': 'per'}),
+                         ('etc. per', [('\u00b6', 'deleted'), ('&c.', 'etc.'), ('ꝑ', 'per')]))
+
 
 if __name__ == '__main__':
     unittest.main()